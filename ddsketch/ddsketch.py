@@ -131,6 +131,37 @@ class BaseDDSketch:
         if val > self.max:
             self.max = val
 
+    def add_many(self, values, weight=1.0):
+        """Add several values to the sketch, each with the same weight."""
+        if weight <= 0.0:
+            raise IllegalArgumentException("weight must be a positive float")
+
+        values = list(values)
+        if not values:
+            return
+
+        min_possible = self.mapping.min_possible
+        positive_keys = []
+        negative_keys = []
+        zero_count = 0
+        for val in values:
+            if val > min_possible:
+                positive_keys.append(self.mapping.key(val))
+            elif val < -min_possible:
+                negative_keys.append(self.mapping.key(-val))
+            else:
+                zero_count += 1
+
+        self.store.add_many(positive_keys, weight)
+        self.negative_store.add_many(negative_keys, weight)
+        self.zero_count += zero_count * weight
+
+        # Keep track of summary stats
+        self.count += len(values) * weight
+        self._sum += sum(values) * weight
+        self.min = min(self.min, min(values))
+        self.max = max(self.max, max(values))
+
     def get_quantile_value(self, quantile):
         """the approximate value at the specified quantile
 
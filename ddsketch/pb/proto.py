@@ -52,19 +52,31 @@ class StoreProto:
     @classmethod
     def to_proto(cls, store):
         """serialize to protobuf"""
+        if store.min_key > store.max_key:
+            # the store has no bins
+            return pb.Store()
+
+        # only send the bins between min_key and max_key, not the padding around them
         return pb.Store(
-            contiguousBinCounts=store.bins, contiguousBinIndexOffset=store.offset
+            contiguousBinCounts=store.bins[
+                store.min_key - store.offset : store.max_key - store.offset + 1
+            ],
+            contiguousBinIndexOffset=store.min_key,
         )
 
     @classmethod
     def from_proto(cls, proto):
         """deserialize from protobuf"""
         store = DenseStore()
-        index = proto.contiguousBinIndexOffset
-        store.offset = index
-        for count in proto.contiguousBinCounts:
-            store.add(index, count)
-            index += 1
+        bins = list(proto.contiguousBinCounts)
+        if bins:
+            # the contiguous counts are laid out like the bins of a DenseStore, so
+            # they can be used as is rather than added one by one
+            store.bins = bins
+            store.offset = proto.contiguousBinIndexOffset
+            store.min_key = store.offset
+            store.max_key = store.offset + len(bins) - 1
+            store.count = sum(bins)
         return store
 
 
@@ -9,7 +9,11 @@ otherwise."""
 
 from abc import ABC
 from abc import abstractmethod
-import math
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
+from operator import add
 
 
 CHUNK_SIZE = 128
@@ -24,6 +28,8 @@ class Store(ABC):
         max_key (int): the maximum key bin
     """
 
+    __slots__ = ("count", "min_key", "max_key")
+
     def __init__(self):
         self.count = 0
         self.min_key = float("+inf")
@@ -42,6 +48,12 @@ class Store(ABC):
         """Updates the counter at the specified index key, growing the number of bins if
         necessary."""
 
+    def add_many(self, keys, weight=1.0):
+        """Updates the counters at each of the specified keys by the weight, growing
+        the number of bins if necessary."""
+        for key in keys:
+            self.add(key, weight)
+
     @abstractmethod
     def key_at_rank(self, rank, lower=True):
         """Return the key for the value at given rank.
@@ -79,21 +91,26 @@ class DenseStore(Store):
         bins (List[int]): the bins
     """
 
+    __slots__ = ("chunk_size", "offset", "bins", "_cumulative_counts")
+
     def __init__(self, chunk_size=CHUNK_SIZE):
         super().__init__()
 
         self.chunk_size = chunk_size
         self.offset = 0
         self.bins = []
+        # cumulative counts of the bins, computed lazily by key_at_rank and reset
+        # whenever the bins change
+        self._cumulative_counts = None
 
     def __repr__(self):
-        repr_str = "{"
-        for i, sbin in enumerate(self.bins):
-            repr_str += f"{i+self.offset}: {sbin}, "
-        repr_str += (
-            f"}}, min_key:{self.min_key}, max_key:{self.max_key}, offset:{self.offset}"
+        bins_str = "".join(
+            f"{i + self.offset}: {sbin}, " for i, sbin in enumerate(self.bins)
+        )
+        return (
+            f"{{{bins_str}}}, min_key:{self.min_key}, max_key:{self.max_key}, "
+            f"offset:{self.offset}"
         )
-        return repr_str
 
     def copy(self, store):
         self.bins = store.bins[:]
@@ -101,33 +118,69 @@ class DenseStore(Store):
         self.min_key = store.min_key
         self.max_key = store.max_key
         self.offset = store.offset
+        self._cumulative_counts = None
 
     def length(self):
         """the number of bins"""
         return len(self.bins)
 
     def add(self, key, weight=1.0):
-        idx = self._get_index(key)
-        self.bins[idx] += weight
+        if self.min_key <= key <= self.max_key:
+            # the key is within the current range; no need to grow or collapse
+            self.bins[key - self.offset] += weight
+        else:
+            idx = self._get_index(key)
+            self.bins[idx] += weight
         self.count += weight
+        self._cumulative_counts = None
+
+    def add_many(self, keys, weight=1.0):
+        """Override. Extend the range once to cover all the keys, then update the
+        counters of the distinct keys."""
+        key_counts = Counter(keys)
+        if not key_counts:
+            return
+
+        min_key = min(key_counts)
+        max_key = max(key_counts)
+        if min_key < self.min_key or max_key > self.max_key:
+            self._extend_range(min_key, max_key)
+
+        # the range already covers the keys, so the bins are not replaced below
+        bins = self.bins
+        if self.min_key <= min_key and max_key <= self.max_key:
+            offset = self.offset
+            for key, key_count in key_counts.items():
+                bins[key - offset] += key_count * weight
+        else:
+            # some keys fall outside of the range of a collapsing store
+            get_index = self._get_index
+            for key, key_count in key_counts.items():
+                bins[get_index(key)] += key_count * weight
+        self.count += sum(key_counts.values()) * weight
+        self._cumulative_counts = None
 
     def _get_index(self, key):
         """calculate the bin index for the key, extending the range if necessary"""
 
-        if key < self.min_key:
-            self._extend_range(key)
-        elif key > self.max_key:
+        if key < self.min_key or key > self.max_key:
             self._extend_range(key)
 
         return key - self.offset
 
     def _get_new_length(self, new_min_key, new_max_key):
+        """the number of bins needed to cover the range, grown geometrically so that
+        the cost of growing the bins is amortized over the number of added keys
+        """
         desired_length = new_max_key - new_min_key + 1
-        return self.chunk_size * math.ceil((desired_length) / self.chunk_size)
+        if desired_length > self.length():
+            desired_length = max(desired_length, 2 * self.length())
+        return self.chunk_size * -(-desired_length // self.chunk_size)
 
     def _extend_range(self, key, second_key=None):
         """Grow the bins as necessary and call _adjust"""
-        second_key = second_key or key
+        if second_key is None:
+            second_key = key
         new_min_key = min(key, second_key, self.min_key)
         new_max_key = max(key, second_key, self.max_key)
 
@@ -137,7 +190,7 @@ class DenseStore(Store):
             self.offset = new_min_key
             self._adjust(new_min_key, new_max_key)
 
-        elif new_min_key >= self.min_key and new_max_key < self.offset + self.length():
+        elif new_min_key >= self.offset and new_max_key < self.offset + self.length():
             # no need to change the range; just update min/max keys
             self.min_key = new_min_key
             self.max_key = new_max_key
@@ -158,12 +211,12 @@ class DenseStore(Store):
         self.max_key = new_max_key
 
     def _shift_bins(self, shift):
-        """shift the bins; this changes the offset"""
+        """shift the bins in place; this changes the offset"""
         if shift > 0:
-            self.bins = self.bins[:-shift]
+            del self.bins[-shift:]
             self.bins[:0] = [0] * shift
         else:
-            self.bins = self.bins[abs(shift) :]
+            del self.bins[: abs(shift)]
             self.bins.extend([0] * abs(shift))
         self.offset -= shift
 
@@ -173,11 +226,16 @@ class DenseStore(Store):
         self._shift_bins(self.offset + self.length() // 2 - middle_key)
 
     def key_at_rank(self, rank, lower=True):
-        running_ct = 0
-        for i, bin_ct in enumerate(self.bins):
-            running_ct += bin_ct
-            if (lower and running_ct > rank) or (not lower and running_ct >= rank + 1):
-                return i + self.offset
+        if self._cumulative_counts is None:
+            self._cumulative_counts = list(accumulate(self.bins))
+        cumulative_counts = self._cumulative_counts
+        if lower:
+            i = bisect_right(cumulative_counts, rank)
+        else:
+            i = bisect_left(cumulative_counts, rank + 1)
+
+        if i < len(cumulative_counts):
+            return i + self.offset
 
         return self.max_key
 
@@ -185,18 +243,59 @@ class DenseStore(Store):
         if store.count == 0:
             return
 
+        self._cumulative_counts = None
         if self.count == 0:
             self.copy(store)
             return
 
-        if store.min_key < self.min_key or store.max_key > self.max_key:
-            self._extend_range(store.min_key, store.max_key)
+        new_min_key = min(self.min_key, store.min_key)
+        new_max_key = max(self.max_key, store.max_key)
+        covered = (
+            self.offset <= new_min_key and new_max_key < self.offset + self.length()
+        )
+
+        if not covered and (new_min_key, new_max_key) == (store.min_key, store.max_key):
+            # the range of this store is within the range of the other one: start
+            # from a copy of the other store and add the bins of this one to it
+            bins, offset = self.bins, self.offset
+            min_key, max_key = self.min_key, self.max_key
+            count = self.count
+            self.copy(store)
+            self._add_bins(bins, offset, min_key, max_key)
+            self.count += count
+            return
 
-        for key in range(store.min_key, store.max_key + 1):
-            self.bins[key - self.offset] += store.bins[key - store.offset]
+        if not covered:
+            # allocate the bins for the union of the ranges at once, centered like
+            # _extend_range would, and align the bins of this store into them
+            new_length = self._get_new_length(new_min_key, new_max_key)
+            new_offset = (
+                new_min_key + (new_max_key - new_min_key + 1) // 2 - new_length // 2
+            )
+            bins = [0] * new_length
+            bins[self.min_key - new_offset : self.max_key - new_offset + 1] = self.bins[
+                self.min_key - self.offset : self.max_key - self.offset + 1
+            ]
+            self.bins = bins
+            self.offset = new_offset
+        self.min_key = new_min_key
+        self.max_key = new_max_key
 
+        self._add_bins(store.bins, store.offset, store.min_key, store.max_key)
         self.count += store.count
 
+    def _add_bins(self, bins, offset, min_key, max_key):
+        """add the bins with the given offset for the keys from min_key to max_key
+        (inclusive) to the bins of this store, which must already cover those keys"""
+        start = min_key - self.offset
+        end = max_key - self.offset + 1
+        bins_start = min_key - offset
+        self.bins[start:end] = map(
+            add,
+            self.bins[start:end],
+            bins[bins_start : bins_start + end - start],
+        )
+
 
 class CollapsingLowestDenseStore(DenseStore):
     """A dense store that keeps all the bins between the bin for the min_key and the
@@ -215,6 +314,8 @@ class CollapsingLowestDenseStore(DenseStore):
         bins (List[int]): the bins
     """
 
+    __slots__ = ("bin_limit", "is_collapsed")
+
     def __init__(self, bin_limit, chunk_size=CHUNK_SIZE):
         super().__init__()
         self.bin_limit = bin_limit
@@ -226,9 +327,8 @@ class CollapsingLowestDenseStore(DenseStore):
         super().copy(store)
 
     def _get_new_length(self, new_min_key, new_max_key):
-        desired_length = new_max_key - new_min_key + 1
         return min(
-            self.chunk_size * math.ceil((desired_length) / self.chunk_size),
+            super()._get_new_length(new_min_key, new_max_key),
             self.bin_limit,
         )
 
@@ -260,7 +360,7 @@ class CollapsingLowestDenseStore(DenseStore):
                 # put everything in the first bin
                 self.offset = new_min_key
                 self.min_key = new_min_key
-                self.bins[:] = [0] * self.length()
+                self.bins = [0] * self.length()
                 self.bins[0] = self.count
             else:
                 shift = self.offset - new_min_key
@@ -270,12 +370,10 @@ class CollapsingLowestDenseStore(DenseStore):
                     collapsed_count = sum(
                         self.bins[collapse_start_index:collapse_end_index]
                     )
-                    self.bins[collapse_start_index:collapse_end_index] = [0] * (
-                        new_min_key - self.min_key
-                    )
                     self.bins[collapse_end_index] += collapsed_count
                     self.min_key = new_min_key
-                    # shift the buckets to make room for new_max_key
+                    # shift the buckets to make room for new_max_key; this drops the
+                    # collapsed bins
                     self._shift_bins(shift)
                 else:
                     self.min_key = new_min_key
@@ -294,6 +392,7 @@ class CollapsingLowestDenseStore(DenseStore):
         if store.count == 0:
             return
 
+        self._cumulative_counts = None
         if self.count == 0:
             self.copy(store)
             return
@@ -301,6 +400,12 @@ class CollapsingLowestDenseStore(DenseStore):
         if store.min_key < self.min_key or store.max_key > self.max_key:
             self._extend_range(store.min_key, store.max_key)
 
+        if store.max_key < self.min_key:
+            # all the bins of the store collapse into the first bin
+            self.bins[0] += store.count
+            self.count += store.count
+            return
+
         collapse_start_idx = store.min_key - store.offset
         collapse_end_idx = min(self.min_key, store.max_key + 1) - store.offset
         if collapse_end_idx > collapse_start_idx:
@@ -309,8 +414,9 @@ class CollapsingLowestDenseStore(DenseStore):
         else:
             collapse_end_idx = collapse_start_idx
 
-        for key in range(collapse_end_idx + store.offset, store.max_key + 1):
-            self.bins[key - self.offset] += store.bins[key - store.offset]
+        self._add_bins(
+            store.bins, store.offset, collapse_end_idx + store.offset, store.max_key
+        )
 
         self.count += store.count
 
@@ -332,6 +438,8 @@ class CollapsingHighestDenseStore(DenseStore):
         bins (List[int]): the bins
     """
 
+    __slots__ = ("bin_limit", "is_collapsed")
+
     def __init__(self, bin_limit, chunk_size=CHUNK_SIZE):
         super().__init__()
         self.bin_limit = bin_limit
@@ -343,9 +451,8 @@ class CollapsingHighestDenseStore(DenseStore):
         super().copy(store)
 
     def _get_new_length(self, new_min_key, new_max_key):
-        desired_length = new_max_key - new_min_key + 1
         return min(
-            self.chunk_size * math.ceil((desired_length) / self.chunk_size),
+            super()._get_new_length(new_min_key, new_max_key),
             self.bin_limit,
         )
 
@@ -376,7 +483,7 @@ class CollapsingHighestDenseStore(DenseStore):
                 # put everything in the last bin
                 self.offset = new_min_key
                 self.max_key = new_max_key
-                self.bins[:] = [0] * self.length()
+                self.bins = [0] * self.length()
                 self.bins[-1] = self.count
             else:
                 shift = self.offset - new_min_key
@@ -386,12 +493,10 @@ class CollapsingHighestDenseStore(DenseStore):
                     collapsed_count = sum(
                         self.bins[collapse_start_index:collapse_end_index]
                     )
-                    self.bins[collapse_start_index:collapse_end_index] = [0] * (
-                        self.max_key - new_max_key
-                    )
                     self.bins[collapse_start_index - 1] += collapsed_count
                     self.max_key = new_max_key
-                    # shift the buckets to make room for new_max_key
+                    # shift the buckets to make room for new_min_key; this drops the
+                    # collapsed bins
                     self._shift_bins(shift)
                 else:
                     self.max_key = new_max_key
@@ -410,6 +515,7 @@ class CollapsingHighestDenseStore(DenseStore):
         if store.count == 0:
             return
 
+        self._cumulative_counts = None
         if self.count == 0:
             self.copy(store)
             return
@@ -417,6 +523,12 @@ class CollapsingHighestDenseStore(DenseStore):
         if store.min_key < self.min_key or store.max_key > self.max_key:
             self._extend_range(store.min_key, store.max_key)
 
+        if store.min_key > self.max_key:
+            # all the bins of the store collapse into the last bin
+            self.bins[-1] += store.count
+            self.count += store.count
+            return
+
         collapse_end_idx = store.max_key - store.offset + 1
         collapse_start_idx = max(self.max_key + 1, store.min_key) - store.offset
         if collapse_end_idx > collapse_start_idx:
@@ -425,7 +537,11 @@ class CollapsingHighestDenseStore(DenseStore):
         else:
             collapse_start_idx = collapse_end_idx
 
-        for key in range(store.min_key, collapse_start_idx + store.offset):
-            self.bins[key - self.offset] += store.bins[key - store.offset]
+        self._add_bins(
+            store.bins,
+            store.offset,
+            store.min_key,
+            collapse_start_idx + store.offset - 1,
+        )
 
         self.count += store.count
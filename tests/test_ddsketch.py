@@ -101,6 +101,16 @@ class BaseTestDDSketches(ABC):
             sketch.add(value, count)
         self._evaluate_sketch_accuracy(sketch, data, TEST_REL_ACC)
 
+    def test_add_many(self):
+        """Test DDSketch on adding values in batches"""
+        for dataset in DATASETS:
+            for size in TEST_SIZES:
+                data = dataset(size)
+                sketch = self._new_dd_sketch()
+                sketch.add_many(data.data[: size // 2])
+                sketch.add_many(data.data[size // 2 :])
+                self._evaluate_sketch_accuracy(sketch, data, TEST_REL_ACC)
+
     def test_add_decimal(self):
         """Test DDSketch on adding decimal weighted values"""
         sketch = self._new_dd_sketch()
@@ -52,12 +52,38 @@ class TestCubicallyInterpolatedMapping(BaseTestKeyMappingProto, TestCase):
 
 
 class TestStoreProto(TestDenseStore, TestCase):
-    def _test_store(self, values):
+    def _test_store(self, values, add_many=False):
         store = DenseStore()
-        for val in values:
-            store.add(val)
+        if add_many:
+            store.add_many(values)
+        else:
+            for val in values:
+                store.add(val)
         self._test_values(StoreProto.from_proto(StoreProto.to_proto(store)), values)
 
+    def test_round_trip_without_padding(self):
+        """Test that only the bins between min_key and max_key are serialized"""
+        store = DenseStore()
+        for val in [-3, 4, 4, 10]:
+            store.add(val)
+        self.assertGreater(store.length(), 14)
+
+        proto = StoreProto.to_proto(store)
+        self.assertEqual(proto.contiguousBinIndexOffset, -3)
+        self.assertEqual(len(proto.contiguousBinCounts), 14)
+
+        round_trip_store = StoreProto.from_proto(proto)
+        self.assertEqual(round_trip_store.count, 4)
+        self.assertEqual(round_trip_store.min_key, -3)
+        self.assertEqual(round_trip_store.max_key, 10)
+        self.assertEqual(round_trip_store.key_at_rank(1), 4)
+
+    def test_round_trip_empty(self):
+        """Test serializing an empty store"""
+        proto = StoreProto.to_proto(DenseStore())
+        self.assertEqual(len(proto.contiguousBinCounts), 0)
+        self.assertEqual(StoreProto.from_proto(proto).count, 0)
+
 
 class TestDDSketchProto(TestDDSketch, TestCase):
     def _evaluate_sketch_accuracy(self, sketch, data, eps, summary_stats=False):
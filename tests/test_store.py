@@ -85,6 +85,13 @@ class BaseTestStore(ABC):
         self._test_store([EXTREME_MIN, EXTREME_MAX])
         self._test_store([EXTREME_MAX, EXTREME_MIN])
 
+    def test_add_many(self):
+        """test adding values in batches"""
+        self._test_store([], add_many=True)
+        self._test_store([0] * 100, add_many=True)
+        self._test_store(list(range(-1000, 1000)), add_many=True)
+        self._test_store([x for x in range(10) for i in range(2 * x)], add_many=True)
+
     def test_merging_empty(self):
         """test merging empty stores"""
         self._test_merging([[], []])
@@ -96,6 +103,17 @@ class BaseTestStore(ABC):
         self._test_merging([[10000], [-10000], [0]])
         self._test_merging([[10000, 0], [-10000], [0]])
 
+    def test_merging_zero_max_key(self):
+        """test merging stores whose max key is zero"""
+        self._test_merging([[-10, -5], [-3, 0]])
+        self._test_merging([[-1000, -500], [-300, 0]])
+
+    def test_merging_contained(self):
+        """test merging stores whose range is within the range of the other"""
+        self._test_merging([[0], [-1000, 1000]])
+        self._test_merging([[-1000, 1000], [0]])
+        self._test_merging([[5, 6], [-1000, 0, 1000], [3]])
+
     def test_merging_constant(self):
         """test merging stores with the same constants"""
         self._test_merging([[2, 2], [2, 2, 2], [2]])
@@ -147,10 +165,13 @@ class TestDenseStore(BaseTestStore, TestCase):
                 if sbin != 0:
                     self.assertEqual(counter[i + store.offset], sbin)
 
-    def _test_store(self, values):
+    def _test_store(self, values, add_many=False):
         store = DenseStore()
-        for val in values:
-            store.add(val)
+        if add_many:
+            store.add_many(values)
+        else:
+            for val in values:
+                store.add(val)
         self._test_values(store, values)
 
     def _test_merging(self, list_values):
@@ -184,6 +205,37 @@ class TestDenseStore(BaseTestStore, TestCase):
         self.assertEqual(store.key_at_rank(0.5, lower=False), 10)
         self.assertEqual(store.key_at_rank(1.5, lower=False), 100)
 
+    def test_add_lower_key_within_bins(self):
+        """Test that adding a lower key already covered by the bins does not move
+        or resize them"""
+        store = DenseStore()
+        store.add(10)
+        offset = store.offset
+        length = len(store.bins)
+        self.assertLess(offset, 9)
+
+        for key in range(9, offset - 1, -1):
+            store.add(key)
+            self.assertEqual(store.min_key, key)
+            self.assertEqual(store.offset, offset)
+            self.assertEqual(len(store.bins), length)
+
+    def test_key_at_rank_after_update(self):
+        """Test that key_at_rank reflects the values added or merged after a query"""
+        store = DenseStore()
+        store.add(4)
+        self.assertEqual(store.key_at_rank(0), 4)
+        store.add(1)
+        self.assertEqual(store.key_at_rank(0), 1)
+        store.add_many([-2, -2])
+        self.assertEqual(store.key_at_rank(1), -2)
+        other_store = DenseStore()
+        other_store.add(-5)
+        store.merge(other_store)
+        self.assertEqual(store.key_at_rank(0), -5)
+        store.copy(other_store)
+        self.assertEqual(store.key_at_rank(0, lower=False), -5)
+
     def test_extreme_values(self):
         """Override. DenseStore is not meant to be used with values that are extremely
         far from one another as it would allocate an excessively large
@@ -218,11 +270,14 @@ class TestCollapsingLowestDenseStore(BaseTestStore, TestCase):
                 if sbin != 0:
                     self.assertEqual(counter[i + store.offset], sbin)
 
-    def _test_store(self, values):
+    def _test_store(self, values, add_many=False):
         for bin_limit in TEST_BIN_LIMIT:
             store = CollapsingLowestDenseStore(bin_limit)
-            for val in values:
-                store.add(val)
+            if add_many:
+                store.add_many(values)
+            else:
+                for val in values:
+                    store.add(val)
             self._test_values(store, values)
 
     def _test_merging(self, list_values):
@@ -259,11 +314,14 @@ class TestCollapsingHighestDenseStore(BaseTestStore, TestCase):
                 if sbin != 0:
                     self.assertEqual(counter[i + store.offset], sbin)
 
-    def _test_store(self, values):
+    def _test_store(self, values, add_many=False):
         for bin_limit in TEST_BIN_LIMIT[1:2]:
             store = CollapsingHighestDenseStore(bin_limit)
-            for val in values:
-                store.add(val)
+            if add_many:
+                store.add_many(values)
+            else:
+                for val in values:
+                    store.add(val)
             self._test_values(store, values)
 
     def _test_merging(self, list_values):